@@ -19,6 +19,7 @@ from utils.mcp_server import DocumentMCPServer
 from utils.summarizer import Summarizer
 from utils.azure_integration import search_in_azure, index_in_azure_search, azure_gpt_chat_completion
 from utils.vector_search import VectorSearcher
+from utils.document_processor import shutdown_pdf_pool
 
 warnings.filterwarnings("ignore")
 load_dotenv()
@@ -42,8 +43,9 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 
 queue_manager = None
 mcp_server = None
-summarizer = Summarizer()
-vector_searcher = VectorSearcher()
+# Modelos criados no startup, e não no import: o import do main.py não deve carregar BART/MiniLM
+summarizer = None
+vector_searcher = None
 
 class Mensagem(BaseModel):
     role: str
@@ -55,12 +57,18 @@ class ConsultaRequest(BaseModel):
 
 @app.on_event("startup")
 async def startup_event():
-    global mcp_server, queue_manager
+    global mcp_server, queue_manager, summarizer, vector_searcher
     try:
         logger.info("[STARTUP] Iniciando inicialização...")
         
         PathManager.initialize()
 
+        logger.info("[STARTUP] Carregando modelos...")
+        if summarizer is None:
+            summarizer = Summarizer()
+        if vector_searcher is None:
+            vector_searcher = VectorSearcher()
+
         logger.info("[STARTUP] Iniciando MCP Server...")
         if not mcp_server:
             mcp_server_inst = DocumentMCPServer()
@@ -71,10 +79,11 @@ async def startup_event():
         queue_manager = QueueManager(AMQP_URL, mcp_server)
         await queue_manager.initialize()
 
-        await queue_manager.setup_consumer('audio_processing', queue_manager.process_audio_message)
-        await queue_manager.setup_consumer('document_processing', queue_manager.process_document_message)
-        await queue_manager.setup_consumer('image_processing', queue_manager.process_image_message)
-        await queue_manager.setup_consumer('video_processing', queue_manager.process_video_message)
+        # Áudio (Whisper) é CPU/GPU-bound: uma mensagem por vez; demais filas em paralelo
+        await queue_manager.setup_consumer('audio_processing', queue_manager.process_audio_message, prefetch=1)
+        await queue_manager.setup_consumer('document_processing', queue_manager.process_document_message, prefetch=16)
+        await queue_manager.setup_consumer('image_processing', queue_manager.process_image_message, prefetch=8)
+        await queue_manager.setup_consumer('video_processing', queue_manager.process_video_message, prefetch=4)
         
         logger.info("Queue Manager inicializado")
 
@@ -90,6 +99,7 @@ async def shutdown_event():
             await queue_manager.close()
         if mcp_server:
             await mcp_server.close()
+        shutdown_pdf_pool()
         logger.info("[SHUTDOWN] Conexões fechadas com sucesso")
     except Exception as e:
         logger.error(f"[SHUTDOWN] Erro ao finalizar conexões: {str(e)}")
@@ -232,10 +242,10 @@ async def consultar(request: ConsultaRequest, skip: int = 0, top: int = 50):
     if not results:
         return {"resposta": "Não encontrei documentos relevantes.", "results": [], "total_count": total_count}
 
-    contexto = ""
-    for d in results:
-        trecho = d.get('content', '')
-        contexto += f"[{d['id']} - {d['file_name']} - {d['file_type']}]: {trecho}\n\n"
+    contexto = "".join(
+        f"[{d['id']} - {d['file_name']} - {d['file_type']}]: {d.get('content', '')}\n\n"
+        for d in results
+    )
 
     resposta = await azure_gpt_chat_completion(query=pergunta, context=contexto)
 
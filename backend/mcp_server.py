@@ -18,7 +18,7 @@ class DocumentMCPServer:
     def __init__(self, db_manager):
         self.db_manager = db_manager
         self.audio_processor = AudioProcessor()
-        self.image_processor = ImageProcessor()
+        self.image_processor = ImageProcessor(db_manager)
         self.document_processor = DocumentProcessor()
         self.video_processor = VideoProcessor()
         
@@ -1,76 +1,48 @@
 import sqlite3
 import logging
+import functools
 from pathlib import Path
 from typing import Dict, List
 import os
-from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
+import aiosqlite
+import httpx
+from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
+from utils.db_manager import CORPUS_VERSION_SCHEMA
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-class DocumentMCPServer:
-    def __init__(self, db_manager=None):
-        self.db_manager = db_manager
-        self.anthropic = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        if not os.getenv("ANTHROPIC_API_KEY"):
-            raise ValueError("ANTHROPIC_API_KEY não configurada")
-        self._initialized = False
-
-    async def initialize(self):
-        logger.info("Inicializando MCP Server...")
-        self._initialized = True
-        logger.info("MCP Server inicializado com sucesso.")
-
-    async def process_query(self, query: str) -> str:
-        try:
-            db_path = Path(__file__).parents[2] / "database" / "banco.db"
-            conn = sqlite3.connect(str(db_path))
-            cursor = conn.cursor()
-
-            # Conta documentos por tipo
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN file_type = 'audio' THEN 1 ELSE 0 END) as audios,
-                    SUM(CASE WHEN file_type = 'image' THEN 1 ELSE 0 END) as fotos,
-                    SUM(CASE WHEN file_type = 'video' THEN 1 ELSE 0 END) as videos,
-                    SUM(CASE WHEN file_type = 'document' THEN 1 ELSE 0 END) as docs
-                FROM processed_content
-            """)
-            stats = cursor.fetchone()
-            total, audios, fotos, videos, docs = stats
-
-            # Busca documentos
-            cursor.execute("""
-                SELECT id, file_name, file_type, content 
-                FROM processed_content 
-                ORDER BY id
-            """)
-            documentos = cursor.fetchall()
-            conn.close()
-
-            # Cria descrição dos tipos
-            tipos_desc = []
-            if audios > 0: tipos_desc.append(f"{audios} transcrições de áudio")
-            if fotos > 0: tipos_desc.append(f"{fotos} textos extraídos de imagens")
-            if videos > 0: tipos_desc.append(f"{videos} transcrições de vídeo")
-            if docs > 0: tipos_desc.append(f"{docs} documentos")
-
-            if len(tipos_desc) > 1:
-                tipos_str = ", ".join(tipos_desc[:-1]) + " e " + tipos_desc[-1]
-            elif tipos_desc:
-                tipos_str = tipos_desc[0]
-            else:
-                tipos_str = "nenhum documento disponível"
-
-            # Cria contexto
-            contexto = "\n\n".join([
-                f"[Documento #{doc[0]} - {doc[1]} ({doc[2]})]: {doc[3]}"
-                for doc in documentos
-            ])
-
-            full_prompt = f"""{HUMAN_PROMPT}Você é um assistente amigável especializado em análise de conversas e documentos.
+DB_PATH = Path(__file__).parents[2] / "database" / "banco.db"
+
+# Documentos maiores que isso entram no contexto pelo sumário persistido na ingestão
+SUMMARY_CONTEXT_THRESHOLD = 8000
+
+# Documentos e estatísticas por tipo em uma única leitura (window functions)
+SQL_CORPUS = f"""
+    SELECT id, file_name, file_type,
+        CASE WHEN length(content) > {SUMMARY_CONTEXT_THRESHOLD} AND COALESCE(summary, '') != ''
+            THEN summary ELSE content END AS content,
+        COUNT(*) OVER () AS total,
+        SUM(CASE WHEN file_type = 'audio' THEN 1 ELSE 0 END) OVER () AS audios,
+        SUM(CASE WHEN file_type = 'image' THEN 1 ELSE 0 END) OVER () AS fotos,
+        SUM(CASE WHEN file_type = 'video' THEN 1 ELSE 0 END) OVER () AS videos,
+        SUM(CASE WHEN file_type = 'document' THEN 1 ELSE 0 END) OVER () AS docs
+    FROM processed_content
+    ORDER BY id
+"""
+
+# Identifica a versão do corpus: muda quando documentos são inseridos, removidos ou editados (sumário incluído)
+SQL_CORPUS_VERSION = """
+    SELECT MAX(id), COUNT(*), (SELECT version FROM corpus_version WHERE id = 1)
+    FROM processed_content
+"""
+
+# Número máximo de respostas mantidas no cache em memória
+RESPONSE_CACHE_SIZE = 512
+
+# Prefixo fixo do prompt; preenchido com str.format a cada nova versão do corpus
+SYSTEM_PROMPT_TEMPLATE = """Você é um assistente amigável especializado em análise de conversas e documentos.
 Você tem acesso a {total} documentos, incluindo {tipos_str}.
 
 Aqui está o conteúdo dos documentos:
@@ -82,17 +54,153 @@ Lembre-se:
 3. Identifique sempre: remetente, destinatário, tipo de conversa e canal
 4. Cite as fontes naturalmente
 5. Seja amigável e conversacional
-6. Responda em português
+6. Responda em português"""
+
+@functools.lru_cache(maxsize=1)
+def get_anthropic_client() -> AsyncAnthropic:
+    """
+    Cliente Anthropic compartilhado pelo processo.
+    Assíncrono e com HTTP/2, reaproveita a conexão TCP/TLS entre consultas
+    e entre instâncias do servidor.
+    """
+    if not os.getenv("ANTHROPIC_API_KEY"):
+        raise ValueError("ANTHROPIC_API_KEY não configurada")
+    return AsyncAnthropic(
+        api_key=os.getenv("ANTHROPIC_API_KEY"),
+        http_client=httpx.AsyncClient(http2=True)
+    )
+
+async def close_anthropic_client():
+    """
+    Fecha o cliente compartilhado, se já criado. Deve ser chamado uma vez,
+    no encerramento do processo: as instâncias não o fecham em close().
+    Nenhum app deste repositório importa este módulo (o main.py usa o
+    utils.mcp_server); quem hospedar o DocumentMCPServer daqui deve chamá-la
+    no próprio evento de shutdown.
+    """
+    if get_anthropic_client.cache_info().currsize:
+        client = get_anthropic_client()
+        get_anthropic_client.cache_clear()
+        await client.close()
 
-{query}{AI_PROMPT}"""
+class DocumentMCPServer:
+    def __init__(self, db_manager=None, db_path: Path = DB_PATH):
+        self.db_manager = db_manager
+        self.db_path = db_path
+        # Conexão aiosqlite persistente, aberta em initialize()
+        self.db = None
+        self.anthropic = get_anthropic_client()
+        # (versão do corpus, blocos de system) do último prefixo montado
+        self._cached_prefix = None
+        # Respostas já geradas, indexadas por (versão do corpus, query normalizada)
+        self._resp_cache: Dict[tuple, str] = {}
+        self._initialized = False
 
-            response = await self.anthropic.completions.create(
-                model="claude-2",
-                max_tokens_to_sample=1024,
-                prompt=full_prompt
+    async def initialize(self):
+        logger.info("Inicializando MCP Server...")
+        if self.db is None:
+            self.db = await aiosqlite.connect(str(self.db_path))
+            await self.db.execute("PRAGMA journal_mode=WAL")
+            await self.db.execute("PRAGMA synchronous=NORMAL")
+            await self.db.execute("PRAGMA cache_size=-65536")
+            await self.db.execute("PRAGMA mmap_size=268435456")
+            await self.db.execute("PRAGMA temp_store=MEMORY")
+            # idx_pc_type duplicava o idx_file_type do init_db.py e nenhuma consulta daqui
+            # filtra por file_type; removido dos bancos onde chegou a ser criado
+            await self.db.execute("DROP INDEX IF EXISTS idx_pc_type")
+            try:
+                # SQL_CORPUS_VERSION depende do contador; o banco pode não ter passado pelo DatabaseManager
+                for statement in CORPUS_VERSION_SCHEMA:
+                    await self.db.execute(statement)
+                await self.db.commit()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Não foi possível criar a tabela corpus_version: {e}")
+        self._initialized = True
+        logger.info("MCP Server inicializado com sucesso.")
+
+    async def _load_corpus(self):
+        """
+        Lê documentos e contagem por tipo em uma única consulta.
+        As linhas são formatadas à medida que chegam do cursor, sem manter
+        a lista completa de linhas em memória junto com o contexto montado.
+        Retorna as estatísticas e o contexto.
+        """
+        stats = (0, 0, 0, 0, 0)
+        partes = []
+        async with self.db.execute(SQL_CORPUS) as cursor:
+            async for row in cursor:
+                if not partes:
+                    stats = row[4:]
+                partes.append(f"[Documento #{row[0]} - {row[1]} ({row[2]})]: {row[3]}")
+        return stats, "\n\n".join(partes)
+
+    async def _corpus_version(self):
+        """Retorna (maior id, total de linhas, contador de edições) de processed_content"""
+        cursor = await self.db.execute(SQL_CORPUS_VERSION)
+        return await cursor.fetchone()
+
+    def _build_system_blocks(self, stats, contexto: str) -> list:
+        """
+        Monta o prefixo estável do prompt (instruções + documentos).
+        O bloco é marcado como cacheável para que consultas seguintes
+        reaproveitem o cache de prompt da Anthropic.
+        """
+        total, audios, fotos, videos, docs = stats
+
+        # Cria descrição dos tipos
+        tipos_desc = []
+        if audios > 0: tipos_desc.append(f"{audios} transcrições de áudio")
+        if fotos > 0: tipos_desc.append(f"{fotos} textos extraídos de imagens")
+        if videos > 0: tipos_desc.append(f"{videos} transcrições de vídeo")
+        if docs > 0: tipos_desc.append(f"{docs} documentos")
+
+        if len(tipos_desc) > 1:
+            tipos_str = ", ".join(tipos_desc[:-1]) + " e " + tipos_desc[-1]
+        elif tipos_desc:
+            tipos_str = tipos_desc[0]
+        else:
+            tipos_str = "nenhum documento disponível"
+
+        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
+            total=total, tipos_str=tipos_str, contexto=contexto
+        )
+
+        return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+    async def process_query(self, query: str) -> str:
+        try:
+            if self.db is None:
+                await self.initialize()
+
+            version = await self._corpus_version()
+
+            # Mesma pergunta sobre o mesmo corpus: devolve a resposta já gerada
+            cache_key = (version, query.strip().lower())
+            cached = self._resp_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Resposta obtida do cache de consultas")
+                return cached
+
+            # O prefixo só é remontado quando novos documentos são ingeridos
+            if self._cached_prefix is None or self._cached_prefix[0] != version:
+                stats, contexto = await self._load_corpus()
+                self._cached_prefix = (version, self._build_system_blocks(stats, contexto))
+                # Respostas de versões anteriores do corpus não serão mais usadas
+                self._resp_cache.clear()
+            system_blocks = self._cached_prefix[1]
+
+            response = await self.anthropic.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=1024,
+                system=system_blocks,
+                messages=[{"role": "user", "content": query}]
             )
 
-            return response.completion
+            resposta = response.content[0].text
+            if len(self._resp_cache) >= RESPONSE_CACHE_SIZE:
+                self._resp_cache.pop(next(iter(self._resp_cache)))
+            self._resp_cache[cache_key] = resposta
+            return resposta
 
         except Exception as e:
             logger.error(f"Erro processando query: {e}")
@@ -109,4 +217,8 @@ Lembre-se:
         return context
 
     async def close(self):
-        pass
\ No newline at end of file
+        # O cliente Anthropic é compartilhado com as outras instâncias e não é
+        # fechado aqui; veja close_anthropic_client()
+        if self.db:
+            await self.db.close()
+            self.db = None
\ No newline at end of file
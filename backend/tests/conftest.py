@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos são importados como 'utils.*', a partir de backend/ (como em main.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.embedding_cache import EmbeddingCache
+
+DIM = 4
+
+def _vectors(n, offset=0):
+    return np.arange(offset, offset + n * DIM, dtype=np.float32).reshape(n, DIM)
+
+def test_round_trip(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM)
+    keys = [EmbeddingCache.key(t) for t in ("a", "b", "c")]
+    vectors = _vectors(3)
+
+    assert cache.lookup(keys) == {}
+    rows = cache.append(keys, vectors)
+    assert cache.lookup(keys) == rows
+    np.testing.assert_array_equal(cache.take([rows[k] for k in reversed(keys)]), vectors[::-1])
+
+    # Um novo processo enxerga o mesmo conteúdo
+    reopened = EmbeddingCache(tmp_path, DIM)
+    assert reopened.lookup(keys) == rows
+    np.testing.assert_array_equal(reopened.take([rows[keys[1]]]), vectors[1:2])
+
+def test_append_after_partial_write_stays_aligned(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM)
+    first = cache.append([EmbeddingCache.key("a")], _vectors(1))
+    # Simula uma gravação interrompida: meia linha no fim do arquivo
+    with open(cache.vectors_path, "ab") as f:
+        f.write(b"\x00" * (cache.row_bytes // 2))
+
+    key_b = EmbeddingCache.key("b")
+    second = cache.append([key_b], _vectors(1, offset=100))
+    assert second[key_b] == 1
+    np.testing.assert_array_equal(cache.take([second[key_b]]), _vectors(1, offset=100))
+    np.testing.assert_array_equal(cache.take(list(first.values())), _vectors(1))
+
+def test_deleted_vectors_file_invalidates_index(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM)
+    key_a = EmbeddingCache.key("a")
+    cache.append([key_a], _vectors(1))
+    cache.vectors_path.unlink()
+
+    reopened = EmbeddingCache(tmp_path, DIM)
+    assert reopened.lookup([key_a]) == {}
+
+    key_b = EmbeddingCache.key("b")
+    rows = reopened.append([key_b], _vectors(1, offset=50))
+    assert reopened.lookup([key_a, key_b]) == rows
+    np.testing.assert_array_equal(reopened.take([rows[key_b]]), _vectors(1, offset=50))
+
+def test_take_rejects_rows_outside_the_file(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM)
+    cache.append([EmbeddingCache.key("a")], _vectors(1))
+    with pytest.raises(ValueError):
+        cache.take([1])
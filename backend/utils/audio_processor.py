@@ -1,12 +1,12 @@
 import logging
 import asyncio
-import whisper
 from pathlib import Path
 import os
 import time
 import speech_recognition as sr
 from moviepy.editor import VideoFileClip
 from typing import Dict, Any
+from .transcribe import get_whisper_model, WHISPER_MODEL
 
 logger = logging.getLogger(__name__)
 
@@ -23,11 +23,11 @@ class AudioProcessor:
             logger.debug("Modelo Whisper já inicializado, pulando...")
             return
             
-        logger.info("Iniciando carregamento do modelo Whisper (versão: base)...")
+        logger.info(f"Iniciando carregamento do modelo Whisper (versão: {WHISPER_MODEL})...")
         try:
             start_time = time.time()
             loop = asyncio.get_event_loop()
-            self.model = await loop.run_in_executor(None, whisper.load_model, "base")
+            self.model = await loop.run_in_executor(None, get_whisper_model)
             self._initialized = True
             load_time = time.time() - start_time
             logger.info(f"Modelo Whisper carregado com sucesso em {load_time:.2f} segundos")
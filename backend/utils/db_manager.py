@@ -15,6 +15,74 @@ BASE_DIR = Path(__file__).parent.parent
 DB_PATH = BASE_DIR / "database" / "banco.db"
 DB_PATH.parent.mkdir(exist_ok=True)
 
+# SQL fixo em constantes: o mesmo objeto string é reutilizado a cada chamada
+# e reaproveitado pelo cache de statements preparados do sqlite3
+STATEMENT_CACHE_SIZE = 256
+
+# Gravações em lote: até WRITE_BATCH_SIZE itens ou WRITE_BATCH_WAIT segundos por transação
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_WAIT = 0.05
+
+# Contador incrementado a cada edição de conteúdo/sumário; compõe a versão do corpus usada
+# pelos caches de prompt e de respostas (MAX(id) e COUNT(*) não mudam num UPDATE).
+# Também aplicado pelo DocumentMCPServer, que pode abrir um banco criado por outro caminho
+CORPUS_VERSION_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS corpus_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO corpus_version (id, version) VALUES (1, 0)",
+    """
+    CREATE TRIGGER IF NOT EXISTS processed_content_version_au
+    AFTER UPDATE OF content, summary ON processed_content BEGIN
+        UPDATE corpus_version SET version = version + 1 WHERE id = 1;
+    END
+    """,
+)
+
+# Insere apenas se ainda não houver registro com o mesmo file_name/file_type
+_SQL_INSERT_PC = """
+    INSERT INTO processed_content
+    (file_name, file_type, content_type, content, metadata, summary)
+    SELECT ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (
+        SELECT 1 FROM processed_content WHERE file_name = ? AND file_type = ?
+    )
+"""
+_SQL_COUNT_PC = "SELECT COUNT(*) FROM processed_content"
+_SQL_LIST_PC = """
+    SELECT id, file_name, file_type, content_type, content, metadata, summary
+    FROM processed_content
+    ORDER BY created_at DESC
+"""
+_SQL_LIST_PC_LIMIT = """
+    SELECT id, file_name, file_type, content_type, content, metadata, summary
+    FROM processed_content
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+_SQL_SEARCH_PC = """
+    SELECT pc.id, pc.file_name, pc.file_type, pc.content_type, pc.content, pc.metadata, pc.summary
+    FROM processed_content_fts f
+    JOIN processed_content pc ON pc.id = f.rowid
+    WHERE processed_content_fts MATCH ?
+    ORDER BY f.rank
+    LIMIT ?
+"""
+_SQL_UPDATE_SUMMARY = "UPDATE processed_content SET summary = ? WHERE id = ?"
+_SQL_SELECT_OCR = "SELECT text FROM ocr_cache WHERE hash = ?"
+_SQL_UPSERT_OCR = "INSERT OR REPLACE INTO ocr_cache (hash, text) VALUES (?, ?)"
+
+def _fts_match_expression(query: str) -> str:
+    """
+    Converte o texto livre da busca em uma expressão MATCH do FTS5.
+    Cada termo vira uma string entre aspas, para que caracteres como
+    '-', '*' ou ':' não sejam interpretados como operadores.
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
 class DatabaseManager:
     def __init__(self, db_path: Path = DB_PATH):
         self.db_path = db_path
@@ -23,6 +91,8 @@ class DatabaseManager:
         self.pool_size = 5
         self._connection_pool = []
         self._pool_lock = Lock()
+        self._write_queue = None
+        self._writer_task = None
         
     async def initialize(self):
         """
@@ -30,10 +100,14 @@ class DatabaseManager:
         e prepara o pool de conexões.
         """
         os.makedirs(self.db_path.parent, exist_ok=True)
-        self.conn = await aiosqlite.connect(self.db_path)
+        self.conn = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        # journal_mode=WAL é persistido no arquivo do banco; basta aplicar uma vez
+        await self.conn.execute("PRAGMA journal_mode=WAL")
         self.cursor = await self.conn.cursor()
         await self.create_tables()
         await self._setup_connection_pool()
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
         logger.info("Banco de dados inicializado com sucesso")
 
     async def create_tables(self):
@@ -51,6 +125,54 @@ class DatabaseManager:
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+
+                # Índice full-text sobre 'content' (LIKE '%q%' não usa índice e força full scan)
+                cursor = await conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'processed_content_fts'"
+                )
+                fts_exists = await cursor.fetchone()
+                await conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS processed_content_fts USING fts5(
+                        content,
+                        content='processed_content',
+                        content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                """)
+
+                # Triggers mantêm o índice sincronizado com a tabela
+                await conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS processed_content_ai AFTER INSERT ON processed_content BEGIN
+                        INSERT INTO processed_content_fts(rowid, content) VALUES (new.id, new.content);
+                    END
+                """)
+                await conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS processed_content_ad AFTER DELETE ON processed_content BEGIN
+                        INSERT INTO processed_content_fts(processed_content_fts, rowid, content)
+                        VALUES ('delete', old.id, old.content);
+                    END
+                """)
+                await conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS processed_content_au AFTER UPDATE OF content ON processed_content BEGIN
+                        INSERT INTO processed_content_fts(processed_content_fts, rowid, content)
+                        VALUES ('delete', old.id, old.content);
+                        INSERT INTO processed_content_fts(rowid, content) VALUES (new.id, new.content);
+                    END
+                """)
+                for statement in CORPUS_VERSION_SCHEMA:
+                    await conn.execute(statement)
+                # Cache de OCR por hash do conteúdo da imagem
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ocr_cache (
+                        hash TEXT PRIMARY KEY,
+                        text TEXT NOT NULL
+                    )
+                """)
+                if not fts_exists:
+                    # Indexa as linhas gravadas antes da existência do FTS
+                    await conn.execute(
+                        "INSERT INTO processed_content_fts(processed_content_fts) VALUES ('rebuild')"
+                    )
                 await conn.commit()
                 logger.info("Tabelas criadas/verificadas com sucesso")
         except Exception as e:
@@ -60,15 +182,21 @@ class DatabaseManager:
     async def _setup_connection_pool(self):
         async with self._pool_lock:
             for _ in range(self.pool_size):
-                conn = await aiosqlite.connect(self.db_path)
-                # Ajustes de performance
-                await conn.execute("PRAGMA journal_mode=WAL")
-                await conn.execute("PRAGMA synchronous=NORMAL")
-                await conn.execute("PRAGMA cache_size=-64000")
-                await conn.execute("PRAGMA temp_store=MEMORY")
-                await conn.execute("PRAGMA mmap_size=268435456")
+                conn = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+                await self._configure_connection(conn)
                 self._connection_pool.append(conn)
 
+    async def _configure_connection(self, conn: aiosqlite.Connection):
+        """
+        Aplica os PRAGMAs que valem apenas por conexão.
+        O checkpoint automático mais espaçado amortiza o custo de COMMITs lentos.
+        """
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA cache_size=-64000")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        await conn.execute("PRAGMA mmap_size=268435456")
+        await conn.execute("PRAGMA wal_autocheckpoint=10000")
+
     @asynccontextmanager
     async def get_connection(self):
         """
@@ -79,7 +207,8 @@ class DatabaseManager:
             if self._connection_pool:
                 conn = self._connection_pool.pop()
             else:
-                conn = await aiosqlite.connect(self.db_path)
+                conn = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+                await self._configure_connection(conn)
         try:
             yield conn
         finally:
@@ -94,11 +223,14 @@ class DatabaseManager:
 
     async def save_processed_content(self, content_data: dict):
         """
-        Salva conteúdo processado no banco, evitando duplicados.
+        Grava conteúdo processado no banco, evitando duplicados.
+        A gravação é feita em lote pelo _writer_loop (chamadas concorrentes dividem
+        a mesma transação); retorna só depois do COMMIT e propaga o erro se o lote falhar.
         content_data formato:
         {
           "type": "document",
           "content": "<texto extraído>",
+          "summary": "<sumário, opcional>",
           "metadata": {
              "file_name": "arquivo.ext",
              "file_type": "document",
@@ -106,41 +238,121 @@ class DatabaseManager:
           }
         }
         """
-        try:
-            logger.info(f"Tentando salvar conteúdo no banco: {content_data['metadata']['file_name']}")
-            async with self.get_connection() as conn:
-                cursor = await conn.execute('''
-                    SELECT id FROM processed_content 
-                    WHERE file_name = ? AND file_type = ?
-                ''', (
-                    content_data['metadata']['file_name'],
-                    content_data['metadata']['file_type']
-                ))
-                existing = await cursor.fetchone()
-                if existing:
-                    logger.info(f"Documento já existe no banco: {content_data['metadata']['file_name']}")
-                    return
-                
-                await conn.execute('''
-                    INSERT INTO processed_content 
-                    (file_name, file_type, content_type, content, metadata, summary)
-                    VALUES (?, ?, ?, ?, ?, '')
-                ''', (
-                    content_data['metadata']['file_name'],
-                    content_data['metadata']['file_type'],
-                    content_data['type'],
-                    content_data['content'],
-                    json.dumps(content_data['metadata'])
-                ))
+        if self._writer_task is None or self._writer_task.done():
+            raise RuntimeError("Gravador do banco não está em execução")
+        logger.info(f"Conteúdo enfileirado para gravação: {content_data['metadata']['file_name']}")
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((content_data, future))
+        await self._wait_writer(future)
+
+    async def flush(self):
+        """
+        Aguarda até que todo o conteúdo enfileirado tenha sido gravado.
+        Sem gravador (antes de initialize() ou depois de close()) não há o que aguardar.
+        """
+        if self._writer_task is not None:
+            await self._wait_writer(self._write_queue.join())
+
+    async def _wait_writer(self, awaitable):
+        """
+        Aguarda 'awaitable' junto com o _writer_loop: se o gravador terminar
+        antes, a fila nunca seria drenada, então falha em vez de travar.
+        """
+        if self._writer_task is None:
+            raise RuntimeError("Gravador do banco não está em execução")
+        waiter = asyncio.ensure_future(awaitable)
+        done, _ = await asyncio.wait({waiter, self._writer_task}, return_when=asyncio.FIRST_COMPLETED)
+        if waiter in done:
+            return waiter.result()
+        waiter.cancel()
+        raise RuntimeError("Gravador do banco encerrado antes de gravar o conteúdo")
+
+    async def _writer_loop(self):
+        """
+        Consome a fila de gravação agrupando itens em uma única transação e
+        resolve (ou falha) o future de cada item. Um item None encerra o loop
+        após gravar o lote corrente.
+        """
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._write_queue.get()
+            if item is None:
+                self._write_queue.task_done()
+                return
+
+            batch = [item]
+            deadline = loop.time() + WRITE_BATCH_WAIT
+            while len(batch) < WRITE_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    self._write_queue.task_done()
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                await self._write_batch([content_data for content_data, _ in batch])
+            except Exception as e:
+                logger.error(f"Erro ao salvar lote de {len(batch)} itens no banco: {str(e)}")
+                # Regrava item a item para que só os conteúdos com problema falhem
+                for content_data, future in batch:
+                    try:
+                        await self._write_batch([content_data])
+                    except Exception as item_error:
+                        logger.error(f"Dados que tentamos salvar: {content_data['metadata'].get('file_name')}")
+                        if not future.done():
+                            future.set_exception(item_error)
+                    else:
+                        if not future.done():
+                            future.set_result(None)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    async def save_processed_content_batch(self, batch: list):
+        """
+        Grava imediatamente uma lista de conteúdos processados em uma única
+        transação, evitando duplicados. Mesmo formato de save_processed_content.
+        """
+        await self._write_batch(batch)
+
+    async def _write_batch(self, batch: list):
+        """
+        Grava um lote de conteúdos com executemany em uma única transação (um único COMMIT).
+        """
+        rows = [
+            (
+                content_data['metadata']['file_name'],
+                content_data['metadata']['file_type'],
+                content_data['type'],
+                content_data['content'],
+                json.dumps(content_data['metadata']),
+                content_data.get('summary', ''),
+                content_data['metadata']['file_name'],
+                content_data['metadata']['file_type']
+            )
+            for content_data in batch
+        ]
+        async with self.get_connection() as conn:
+            try:
+                cursor = await conn.executemany(_SQL_INSERT_PC, rows)
+                saved = cursor.rowcount
                 await conn.commit()
-                cursor = await conn.execute('SELECT COUNT(*) FROM processed_content')
-                count = await cursor.fetchone()
-                logger.info(f"Total de documentos após inserção: {count[0]}")
-                logger.info(f"Conteúdo salvo com sucesso: {content_data['metadata']['file_name']}")
-        except Exception as e:
-            logger.error(f"Erro ao salvar conteúdo no banco: {str(e)}")
-            logger.error(f"Dados que tentamos salvar: {content_data}")
-            raise
+            except Exception:
+                await conn.rollback()
+                raise
+            logger.info(f"Lote gravado no banco: {saved} novos de {len(batch)} itens")
 
     async def list_all_processed_documents(self):
         """
@@ -150,11 +362,7 @@ class DatabaseManager:
         """
         try:
             async with self.get_connection() as conn:
-                cursor = await conn.execute('''
-                    SELECT id, file_name, file_type, content_type, content, metadata, summary
-                    FROM processed_content 
-                    ORDER BY created_at DESC
-                ''')
+                cursor = await conn.execute(_SQL_LIST_PC)
                 rows = await cursor.fetchall()
                 if not rows:
                     return []
@@ -174,21 +382,85 @@ class DatabaseManager:
             logger.error(f"Erro listando documentos: {e}")
             return []
 
+    async def get_documents(self, query: str = None, limit: int = 100):
+        """
+        Busca documentos processados.
+        Com 'query', usa o índice FTS5 e ordena por relevância;
+        sem 'query', retorna os mais recentes.
+        """
+        try:
+            async with self.get_connection() as conn:
+                if query and query.strip():
+                    cursor = await conn.execute(_SQL_SEARCH_PC, (_fts_match_expression(query), limit))
+                else:
+                    cursor = await conn.execute(_SQL_LIST_PC_LIMIT, (limit,))
+                rows = await cursor.fetchall()
+                documents = []
+                for row in rows:
+                    documents.append({
+                        "id": row[0],
+                        "file_name": row[1],
+                        "file_type": row[2],
+                        "content_type": row[3],
+                        "content": row[4],
+                        "metadata": json.loads(row[5]) if row[5] else {},
+                        "summary": row[6] if row[6] else ""
+                    })
+                return documents
+        except Exception as e:
+            logger.error(f"Erro buscando documentos: {e}")
+            return []
+
+    async def get_ocr_cache(self, image_hash: str):
+        """
+        Retorna o texto de OCR já extraído para o hash informado, ou None.
+        """
+        try:
+            async with self.get_connection() as conn:
+                cursor = await conn.execute(_SQL_SELECT_OCR, (image_hash,))
+                row = await cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error(f"Erro consultando cache de OCR: {e}")
+            return None
+
+    async def save_ocr_cache(self, image_hash: str, text: str):
+        """
+        Grava o texto de OCR de uma imagem no cache, indexado pelo hash do conteúdo.
+        """
+        try:
+            async with self.get_connection() as conn:
+                await conn.execute(_SQL_UPSERT_OCR, (image_hash, text))
+                await conn.commit()
+        except Exception as e:
+            logger.error(f"Erro gravando cache de OCR: {e}")
+
     async def update_summary(self, doc_id: int, summary: str):
         """
         Atualiza o campo 'summary' de um documento pelo ID.
         """
         try:
             async with self.get_connection() as conn:
-                await conn.execute('UPDATE processed_content SET summary = ? WHERE id = ?', (summary, doc_id))
+                await conn.execute(_SQL_UPDATE_SUMMARY, (summary, doc_id))
                 await conn.commit()
         except Exception as e:
             logger.error(f"Erro ao atualizar sumário: {e}")
 
     async def close(self):
         """
-        Fecha todas as conexões do pool e a conexão principal.
+        Grava o que ainda estiver na fila e fecha todas as conexões do pool
+        e a conexão principal.
         """
+        if self._writer_task:
+            await self._write_queue.put(None)
+            try:
+                await self._writer_task
+            except Exception as e:
+                # Gravador que já havia falhado não impede o fechamento das conexões
+                logger.error(f"Gravador do banco terminou com erro: {e}")
+            self._writer_task = None
+            self._write_queue = None
+
         async with self._pool_lock:
             for conn in self._connection_pool:
                 try:
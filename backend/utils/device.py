@@ -0,0 +1,27 @@
+import functools
+import logging
+import torch
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=1)
+def get_device() -> str:
+    """Dispositivo usado pelos modelos locais: 'cuda' quando há GPU, senão 'cpu'"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    logger.info(f"Dispositivo para inferência: {device}")
+    return device
+
+def get_torch_dtype() -> torch.dtype:
+    """Precisão dos pesos: bfloat16/float16 na GPU, float32 na CPU"""
+    if get_device() == "cuda":
+        return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    return torch.float32
+
+@functools.lru_cache(maxsize=1)
+def get_faiss_gpu_resources():
+    """Recursos de GPU do FAISS, compartilhados por todos os índices; None sem GPU"""
+    import faiss
+    if faiss.get_num_gpus() == 0:
+        return None
+    logger.info("FAISS usando GPU para os índices exaustivos")
+    return faiss.StandardGpuResources()
@@ -1,17 +1,88 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import aiofiles
 import fitz  # PyMuPDF
 import pandas as pd
 import pytesseract
 from PIL import Image
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import load_workbook
 from pathlib import Path
 from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Abaixo dessa média de caracteres por página o PDF é tratado como digitalizado (sem camada de texto)
+MIN_PDF_CHARS_PER_PAGE = 50
+PDF_OCR_DPI = 200
+
+# Teto de workers do pool de PDFs: cada um carrega PyMuPDF/Tesseract e disputa CPU com o servidor
+PDF_POOL_MAX_WORKERS = 4
+
+@functools.lru_cache(maxsize=1)
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """
+    Pool de processos para extração/OCR de PDFs, compartilhado pelo processo.
+
+    Os workers saem de um forkserver, e não de fork() do servidor: o processo
+    principal já tem threads (torch, tokenizers, OpenMP do FAISS, executores)
+    e vários GB de modelos, e um fork nesse estado pode travar e copia tudo isso.
+    """
+    context = multiprocessing.get_context("forkserver")
+    # Só este módulo (PyMuPDF, pytesseract) é pré-carregado. "__main__" fica de fora:
+    # o forkserver importaria o main.py e, com ele, torch/transformers e suas threads
+    context.set_forkserver_preload([__name__])
+    workers = min(PDF_POOL_MAX_WORKERS, os.cpu_count() or 1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+def shutdown_pdf_pool():
+    """Encerra o pool compartilhado; chamado uma vez, no encerramento do processo"""
+    if get_pdf_pool.cache_info().currsize:
+        get_pdf_pool().shutdown(wait=False, cancel_futures=True)
+        get_pdf_pool.cache_clear()
+
+def _extract_pdf(path: str) -> tuple:
+    """
+    Extrai o texto de todas as páginas do PDF (executado no pool de processos).
+    Retorna o texto e o número de páginas.
+    """
+    with fitz.open(path) as doc:
+        return "".join(page.get_text() for page in doc), doc.page_count
+
+def _ocr_pdf_page(path: str, page_number: int) -> str:
+    """Renderiza uma página do PDF e aplica OCR (executado no pool de processos)"""
+    with fitz.open(path) as doc:
+        pix = doc[page_number].get_pixmap(dpi=PDF_OCR_DPI)
+    image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    return pytesseract.image_to_string(image, lang='por')
+
+def _extract_xlsx(path: str) -> str:
+    """Lê a planilha em modo streaming e gera uma linha tab-separated por linha"""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        lines = []
+        for ws in wb.worksheets:
+            for row in ws.iter_rows(values_only=True):
+                lines.append("\t".join("" if cell is None else str(cell) for cell in row))
+        return "\n".join(lines)
+    finally:
+        wb.close()
+
+def _extract_xls(path: str) -> str:
+    """Formato .xls legado não é suportado pelo openpyxl; usa pandas"""
+    sheets = pd.read_excel(path, sheet_name=None, header=None)
+    return "\n".join(
+        df.to_csv(sep="\t", header=False, index=False) for df in sheets.values()
+    )
+
 class DocumentProcessor:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._initialized = False
+        self._pdf_pool = None
         self.supported_extensions = {
             'txt': self._process_text,
             'pdf': self._process_pdf,
@@ -28,7 +99,8 @@ class DocumentProcessor:
             
         try:
             self.logger.info("Inicializando DocumentProcessor...")
-            # Aqui podemos adicionar qualquer inicialização necessária
+            # Extração de PDF é CPU-bound; roda fora do event loop e do GIL
+            self._pdf_pool = get_pdf_pool()
             self._initialized = True
             self.logger.info("DocumentProcessor inicializado com sucesso")
         except Exception as e:
@@ -55,11 +127,24 @@ class DocumentProcessor:
             self.logger.error(f"Erro processando documento: {e}")
             raise
 
+    async def process_document(self, file_path: Path) -> Dict[str, Any]:
+        """Processa o documento e retorna o conteúdo no formato usado pelo banco"""
+        text = await self.process(str(file_path))
+        return {
+            "type": "document",
+            "content": text,
+            "metadata": {
+                "file_type": file_path.suffix[1:],
+                "file_name": file_path.name
+            }
+        }
+
     async def _process_text(self, file_path: Path) -> str:
         """Processa arquivos de texto"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            async with aiofiles.open(file_path, 'rb') as f:
+                data = await f.read()
+            return data.decode('utf-8', errors='replace')
         except Exception as e:
             self.logger.error(f"Erro processando arquivo de texto: {e}")
             raise
@@ -67,10 +152,18 @@ class DocumentProcessor:
     async def _process_pdf(self, file_path: Path) -> str:
         """Processa arquivos PDF"""
         try:
-            text = ""
-            with fitz.open(file_path) as doc:
-                for page in doc:
-                    text += page.get_text()
+            loop = asyncio.get_running_loop()
+            path = str(file_path)
+            text, page_count = await loop.run_in_executor(self._pdf_pool, _extract_pdf, path)
+
+            # PDF digitalizado: OCR das páginas em paralelo no pool de processos
+            if page_count and len(text.strip()) < MIN_PDF_CHARS_PER_PAGE * page_count:
+                self.logger.info(f"PDF sem camada de texto, aplicando OCR em {page_count} páginas: {file_path}")
+                pages = await asyncio.gather(*(
+                    loop.run_in_executor(self._pdf_pool, _ocr_pdf_page, path, i)
+                    for i in range(page_count)
+                ))
+                text = "".join(pages)
             return text
         except Exception as e:
             self.logger.error(f"Erro processando PDF: {e}")
@@ -79,8 +172,13 @@ class DocumentProcessor:
     async def _process_excel(self, file_path: Path) -> str:
         """Processa arquivos Excel"""
         try:
-            df = pd.read_excel(file_path)
-            return df.to_string()
+            extract = _extract_xls if file_path.suffix.lower() == '.xls' else _extract_xlsx
+            return await asyncio.to_thread(extract, str(file_path))
         except Exception as e:
             self.logger.error(f"Erro processando Excel: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def close(self):
+        """Libera o pool de PDFs; ele é compartilhado e só é encerrado por shutdown_pdf_pool()"""
+        self._pdf_pool = None
+        self._initialized = False
\ No newline at end of file
@@ -0,0 +1,113 @@
+import os
+import fcntl
+import hashlib
+import sqlite3
+import logging
+from pathlib import Path
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Limite de parâmetros por consulta no SQLite
+_SQL_CHUNK = 500
+
+class EmbeddingCache:
+    """
+    Cache em disco de embeddings, chaveado pelo hash do conteúdo.
+
+    Os vetores ficam em um arquivo float32 (lido via memmap) e o SQLite guarda
+    hash -> linha. Um diretório por modelo, já que vetores de modelos diferentes
+    não são comparáveis. Gravações são serializadas por um lock de arquivo, então
+    o diretório pode ser compartilhado entre processos.
+    """
+
+    def __init__(self, cache_dir: Path, dimension: int):
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.row_bytes = 4 * dimension
+        self.vectors_path = cache_dir / "embeddings.f32"
+        self.vectors_path.touch(exist_ok=True)
+        self.lock_path = cache_dir / ".lock"
+        self.conn = sqlite3.connect(str(cache_dir / "index.sqlite"))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, row INTEGER NOT NULL)")
+        self.conn.commit()
+        self._matrix = None
+        with self._locked():
+            self._purge_missing_rows()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def _rows(self) -> int:
+        """Linhas completas no arquivo; bytes parciais de uma gravação interrompida são ignorados"""
+        return self.vectors_path.stat().st_size // self.row_bytes
+
+    def _locked(self):
+        return _FileLock(self.lock_path)
+
+    def _purge_missing_rows(self):
+        """Remove do índice as linhas que não existem mais no arquivo (truncado ou apagado)"""
+        removed = self.conn.execute("DELETE FROM embeddings WHERE row >= ?", (self._rows(),)).rowcount
+        self.conn.commit()
+        if removed:
+            logger.warning(f"{removed} embeddings sem vetor no arquivo removidos do cache")
+
+    def lookup(self, keys: list) -> dict:
+        """Retorna {hash: linha} para as chaves já presentes no cache"""
+        found = {}
+        for i in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[i:i + _SQL_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.conn.execute(
+                f"SELECT hash, row FROM embeddings WHERE hash IN ({placeholders})", chunk
+            ))
+        return found
+
+    def append(self, keys: list, embeddings: np.ndarray) -> dict:
+        """Acrescenta os vetores ao arquivo e registra as linhas; retorna {hash: linha}"""
+        data = np.ascontiguousarray(embeddings, dtype=np.float32).tobytes()
+        with self._locked():
+            self._purge_missing_rows()
+            start = self._rows()
+            # Grava a partir da última linha completa e descarta o que sobrar depois:
+            # bytes parciais de uma gravação interrompida nunca desalinham as linhas.
+            # Os vetores vão para o disco antes do índice, então uma falha no meio
+            # deixa só linhas órfãs, nunca uma consulta apontando para o vetor errado.
+            with open(self.vectors_path, "r+b") as f:
+                f.seek(start * self.row_bytes)
+                f.write(data)
+                f.truncate()
+            rows = {k: start + i for i, k in enumerate(keys)}
+            self.conn.executemany("INSERT OR REPLACE INTO embeddings (hash, row) VALUES (?, ?)", rows.items())
+            self.conn.commit()
+        self._matrix = None
+        return rows
+
+    def take(self, rows: list) -> np.ndarray:
+        """Copia as linhas pedidas do memmap para um array float32 em memória"""
+        last = max(rows)
+        if self._matrix is None or last >= self._matrix.shape[0]:
+            # Outro processo pode ter acrescentado linhas desde o último memmap
+            n_rows = self._rows()
+            if last >= n_rows:
+                raise ValueError(f"Linha {last} fora do cache de embeddings ({n_rows} linhas)")
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dimension))
+        return np.asarray(self._matrix[rows])
+
+class _FileLock:
+    """Lock exclusivo (flock) sobre um arquivo, válido entre processos"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
@@ -0,0 +1,44 @@
+import os
+import logging
+import faiss
+import torch
+from sentence_transformers import SentenceTransformer
+from .device import get_device, get_faiss_gpu_resources
+
+logger = logging.getLogger(__name__)
+
+ENCODE_BATCH_SIZE = 64
+
+# Os embeddings são normalizados, então produto interno = similaridade de cosseno.
+# Acima deste número de vetores a busca exaustiva (IndexFlatIP) fica cara;
+# usamos o grafo HNSW, que visita ~log N vetores por consulta
+HNSW_THRESHOLD = 10_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Busca e inserção no FAISS paralelizadas em todos os núcleos menos um
+faiss.omp_set_num_threads(max(1, (os.cpu_count() or 1) - 1))
+
+def load_encoder(model_name: str):
+    """Encoder em float16 na GPU; na CPU, com as camadas lineares quantizadas em int8"""
+    device = get_device()
+    if device == "cuda":
+        return SentenceTransformer(model_name, device=device).half()
+    return torch.quantization.quantize_dynamic(
+        SentenceTransformer(model_name, device=device), {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+def create_index(dimension: int, n_vectors: int):
+    """Cria o índice FAISS adequado ao tamanho do corpus"""
+    if n_vectors <= HNSW_THRESHOLD:
+        index = faiss.IndexFlatIP(dimension)
+        gpu_resources = get_faiss_gpu_resources()
+        if gpu_resources is not None:
+            # Na GPU a busca exaustiva vira uma multiplicação de matrizes (o HNSW não tem versão GPU)
+            index = faiss.index_cpu_to_gpu(gpu_resources, 0, index)
+        return index
+    index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
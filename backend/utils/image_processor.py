@@ -1,13 +1,77 @@
+import asyncio
+import hashlib
 import logging
+import threading
+import cv2
+import numpy as np
 from PIL import Image
 import pytesseract
 from pathlib import Path
 
+try:
+    import tesserocr
+except ImportError:
+    # tesserocr depende da libtesseract instalada; sem ele o OCR usa o binário via pytesseract
+    tesserocr = None
+
 logger = logging.getLogger(__name__)
 
+TESSERACT_CONFIG = '--oem 1 --psm 6'
+
+# Incrementar ao mudar o pré-processamento (_binarize) ou o motor de OCR:
+# entra na chave do cache, então textos gerados pelo pipeline antigo deixam de ser reaproveitados
+_OCR_PIPELINE_VERSION = 1
+
+# Uma instância da API do Tesseract por thread (PyTessBaseAPI não é thread-safe)
+_tess_local = threading.local()
+
+def _get_tess_api():
+    """Retorna a API do Tesseract da thread atual, carregando o modelo uma única vez"""
+    api = getattr(_tess_local, "api", None)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(
+            lang='por',
+            psm=tesserocr.PSM.SINGLE_BLOCK,
+            oem=tesserocr.OEM.LSTM_ONLY
+        )
+        _tess_local.api = api
+    return api
+
+def _binarize(image: Image.Image) -> Image.Image:
+    """
+    Converte para tons de cinza e binariza com limiar adaptativo (OpenCV),
+    poupando o Tesseract da binarização interna e lidando melhor com iluminação irregular.
+    """
+    gray = np.asarray(image.convert('L'))
+    binary = cv2.adaptiveThreshold(
+        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15
+    )
+    return Image.fromarray(binary)
+
+def _ocr_image(image: Image.Image) -> str:
+    """
+    Aplica OCR em português na imagem.
+    Com tesserocr o reconhecimento roda no próprio processo, sem fork do
+    binário nem escrita de arquivo temporário a cada chamada.
+    """
+    image = _binarize(image)
+    if tesserocr is not None:
+        api = _get_tess_api()
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(image, lang='por', config=TESSERACT_CONFIG)
+
+def _hash_file(file_path: str) -> str:
+    """Chave do cache de OCR: hash do conteúdo do arquivo e da configuração do pipeline"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{_OCR_PIPELINE_VERSION}|{TESSERACT_CONFIG}|".encode())
+    digest.update(Path(file_path).read_bytes())
+    return digest.hexdigest()
+
 class ImageProcessor:
-    def __init__(self):
+    def __init__(self, db_manager=None):
         self.logger = logging.getLogger(__name__)
+        self.db_manager = db_manager
         self._initialized = False
 
     async def initialize(self):
@@ -30,16 +94,25 @@ class ImageProcessor:
             if not self._initialized:
                 await self.initialize()
 
+            # Imagens idênticas já processadas reaproveitam o OCR gravado no banco
+            image_hash = None
+            if self.db_manager:
+                image_hash = await asyncio.to_thread(_hash_file, file_path)
+                cached = await self.db_manager.get_ocr_cache(image_hash)
+                if cached is not None:
+                    self.logger.info(f"Texto da imagem obtido do cache de OCR: {file_path}")
+                    return cached
+
             image = Image.open(file_path)
             
             # Converte para RGB se necessário (para imagens PNG com transparência)
             if image.mode in ('RGBA', 'LA'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                background.paste(image, mask=image.split()[-1])
-                image = background
+                background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+                image = Image.alpha_composite(background, image.convert('RGBA')).convert('RGB')
             
-            # Configura o OCR para português
-            text = pytesseract.image_to_string(image, lang='por')
+            # OCR fora do event loop; motor LSTM e bloco uniforme de texto
+            # (evita a segmentação automática de página)
+            text = await asyncio.to_thread(_ocr_image, image)
             
             # Limpa o texto
             text = text.strip()
@@ -48,6 +121,9 @@ class ImageProcessor:
                 self.logger.warning(f"Nenhum texto encontrado na imagem: {file_path}")
             else:
                 self.logger.info(f"Texto extraído com sucesso da imagem: {file_path}")
+
+            if image_hash:
+                await self.db_manager.save_ocr_cache(image_hash, text)
                 
             return text
             
@@ -30,7 +30,7 @@ class DocumentMCPServer:
             raise
 
     async def close(self):
-        pass
+        await self.document_processor.close()
 
     async def process_audio(self, file_path: str, file_name: str):
         text = await self.audio_processor.process(file_path)
@@ -5,9 +5,12 @@ import logging
 logger = logging.getLogger(__name__)
 
 class PathManager:
-    BASE_DIR = Path("/Users/gustavoferro/Apps/just_back/backend/uploads")
+    BASE_DIR = Path(os.environ.get("JUS_UPLOAD_DIR", Path(__file__).parents[1] / "uploads"))
     PROCESSED_DIR = BASE_DIR / "processed"
     UNPROCESSED_DIR = BASE_DIR / "unprocessed"
+    # Prefixos em string: concatenação é bem mais barata que Path / filename por chamada
+    _processed_prefix = str(PROCESSED_DIR) + os.sep
+    _unprocessed_prefix = str(UNPROCESSED_DIR) + os.sep
 
     @classmethod
     def initialize(cls):
@@ -16,6 +19,8 @@ class PathManager:
             # Cria as pastas se não existirem
             cls.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
             cls.UNPROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+            cls._processed_prefix = str(cls.PROCESSED_DIR) + os.sep
+            cls._unprocessed_prefix = str(cls.UNPROCESSED_DIR) + os.sep
             
             logger.info(f"Diretórios inicializados: {cls.PROCESSED_DIR}, {cls.UNPROCESSED_DIR}")
         except Exception as e:
@@ -23,11 +28,11 @@ class PathManager:
             raise
 
     @classmethod
-    def get_processed_path(cls, filename: str) -> Path:
+    def get_processed_path(cls, filename: str) -> str:
         """Retorna o caminho completo para um arquivo processado"""
-        return cls.PROCESSED_DIR / filename
+        return cls._processed_prefix + filename
 
     @classmethod
-    def get_unprocessed_path(cls, filename: str) -> Path:
+    def get_unprocessed_path(cls, filename: str) -> str:
         """Retorna o caminho completo para um arquivo não processado"""
-        return cls.UNPROCESSED_DIR / filename 
\ No newline at end of file
+        return cls._unprocessed_prefix + filename 
\ No newline at end of file
@@ -1,57 +1,117 @@
+import asyncio
 import logging
+import threading
 from pathlib import Path
 from typing import List
 from .document_processor import DocumentProcessor
 from .audio_processor import AudioProcessor
 from .db_manager import DatabaseManager
+from .summarizer import Summarizer
 
 logger = logging.getLogger(__name__)
 
+# Arquivos processados simultaneamente: mídia usa o Whisper/GPU, documentos são I/O
+MEDIA_CONCURRENCY = 1
+DOCUMENT_CONCURRENCY = 8
+
+# Resultados acumulados antes de cada gravação em lote no banco
+SAVE_BATCH_SIZE = 50
+
 class ProcessingManager:
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, summarizer: Summarizer = None):
         self.db_manager = db_manager
+        # Carregado só no primeiro arquivo processado: construir o manager (ex.: init_db) não baixa o modelo
+        self.summarizer = summarizer
+        self._summarizer_lock = threading.Lock()
         self.document_processor = DocumentProcessor()
         self.audio_processor = AudioProcessor()
+
+        # Tabela de roteamento extensão -> handler, montada uma única vez
+        self._media_extensions = (self.audio_processor.supported_audio_extensions
+                                  | self.audio_processor.supported_video_extensions)
+        self._ext_router = {ext: self.audio_processor.process_media for ext in self._media_extensions}
+        self._ext_router.update({
+            ext: self.document_processor.process_document
+            for ext in self.document_processor.supported_extensions
+        })
+
+        self._media_semaphore = asyncio.Semaphore(MEDIA_CONCURRENCY)
+        self._document_semaphore = asyncio.Semaphore(DOCUMENT_CONCURRENCY)
         
     async def process_files(self, file_paths: List[Path]):
-        """Processa uma lista de arquivos"""
+        """Processa uma lista de arquivos concorrentemente, gravando os resultados em lotes"""
         total_processed = 0
         total_failed = 0
-        
-        for file_path in file_paths:
-            try:
-                logger.info(f"Iniciando processamento do arquivo: {file_path}")
-                result = await self._process_single_file(file_path)
-                
-                if result and 'error' not in result:
-                    logger.info(f"Arquivo processado, salvando no banco: {file_path}")
-                    await self.db_manager.save_processed_content(result)
-                    total_processed += 1
-                    logger.info(f"Arquivo processado e salvo com sucesso: {file_path}")
-                else:
-                    logger.warning(f"Falha ao processar arquivo: {file_path}")
-                    total_failed += 1
-                    
-            except Exception as e:
-                logger.error(f"Erro ao processar {file_path}: {str(e)}")
+        pending = []
+
+        for next_result in asyncio.as_completed([self._process_file(fp) for fp in file_paths]):
+            result = await next_result
+            if result is None:
                 total_failed += 1
-                
+                continue
+
+            pending.append(result)
+            if len(pending) >= SAVE_BATCH_SIZE:
+                saved = await self._save_batch(pending)
+                total_processed += saved
+                total_failed += len(pending) - saved
+                pending = []
+
+        if pending:
+            saved = await self._save_batch(pending)
+            total_processed += saved
+            total_failed += len(pending) - saved
+
         logger.info(f"Processamento concluído. Processados: {total_processed}, Falhas: {total_failed}")
         return total_processed, total_failed
 
+    async def _process_file(self, file_path: Path):
+        """
+        Processa um arquivo respeitando o limite de concorrência do seu tipo.
+        Retorna o conteúdo pronto para o banco, ou None em caso de falha.
+        """
+        extension = file_path.suffix.lower()[1:]
+        semaphore = self._media_semaphore if extension in self._media_extensions else self._document_semaphore
+        try:
+            async with semaphore:
+                logger.info(f"Iniciando processamento do arquivo: {file_path}")
+                result = await self._process_single_file(file_path)
+
+                if not result or 'error' in result:
+                    logger.warning(f"Falha ao processar arquivo: {file_path}")
+                    return None
+
+                # Sumário gerado uma única vez na ingestão e persistido junto ao conteúdo
+                result['summary'] = await asyncio.to_thread(self._summarize, result['content'])
+                return result
+
+        except Exception as e:
+            logger.error(f"Erro ao processar {file_path}: {str(e)}")
+            return None
+
+    def _summarize(self, content: str) -> str:
+        """Gera o sumário, carregando o Summarizer na primeira chamada (executa em thread)"""
+        with self._summarizer_lock:
+            if self.summarizer is None:
+                self.summarizer = Summarizer()
+        return self.summarizer.summarize(content, max_length=300)
+
+    async def _save_batch(self, batch: list) -> int:
+        """Grava um lote de resultados em uma única transação; retorna quantos foram salvos"""
+        try:
+            logger.info(f"Salvando lote de {len(batch)} arquivos no banco")
+            await self.db_manager.save_processed_content_batch(batch)
+            return len(batch)
+        except Exception as e:
+            logger.error(f"Erro ao salvar lote no banco: {str(e)}")
+            return 0
+
     async def _process_single_file(self, file_path: Path):
         """Processa um único arquivo baseado em sua extensão"""
         extension = file_path.suffix.lower()[1:]
-        
-        # Arquivos de mídia (áudio/vídeo)
-        if extension in self.audio_processor.supported_audio_extensions.union(
-                self.audio_processor.supported_video_extensions):
-            return await self.audio_processor.process_media(file_path)
-            
-        # Documentos e imagens
-        elif extension in self.document_processor.supported_extensions:
-            return await self.document_processor.process_document(file_path)
-            
-        else:
-            logger.warning(f"Extensão não suportada: {extension}")
-            return {"error": "Formato não suportado"} 
\ No newline at end of file
+        handler = self._ext_router.get(extension)
+        if handler:
+            return await handler(file_path)
+
+        logger.warning(f"Extensão não suportada: {extension}")
+        return {"error": "Formato não suportado"} 
\ No newline at end of file
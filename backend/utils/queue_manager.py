@@ -1,8 +1,8 @@
 import logging
-import json
+import orjson
 import os
 from aio_pika import connect_robust, Message, DeliveryMode, ExchangeType, IncomingMessage
-from aiormq.exceptions import ChannelNotFoundEntity, ChannelPreconditionFailed
+from aiormq.exceptions import ChannelNotFoundEntity
 import time
 
 logger = logging.getLogger(__name__)
@@ -15,6 +15,12 @@ class QueueManager:
         self.mcp_server = mcp_server
         self.connection = None
         self.channel = None
+        self.dlx = None
+        # Filas já declaradas no canal atual, para evitar um declare (RPC) por chamada
+        self._queues = {}
+        # Um canal por consumidor, que guarda o próprio prefetch (QoS): fila -> (canal, fila no canal).
+        # A referência também mantém viva a fila que o canal robusto restaura (ele só guarda WeakSet)
+        self._consumers = {}
 
     async def initialize(self):
         """Inicializa a conexão com o RabbitMQ"""
@@ -31,20 +37,20 @@ class QueueManager:
         logger.info("Conectando ao RabbitMQ...")
         self.connection = await connect_robust(self.amqp_url)
         self.channel = await self.connection.channel()
+        self._queues.clear()
+        self._consumers.clear()
 
-        # Declarando exchange DLX para mensagens mortas
+        # Exchange DLX para mensagens mortas: reaproveita a existente (declare passivo)
+        # e só a cria, como durável, se ainda não existir
         try:
-            # Primeiro tenta declarar sem durable
-            await self.channel.declare_exchange(
-                'dlx',
-                ExchangeType.DIRECT,
-                durable=False
-            )
-            logger.info("Exchange DLX criada")
-        except ChannelPreconditionFailed:
-            # Se falhar, tenta com durable
+            self.dlx = await self.channel.get_exchange('dlx')
+            logger.info("Exchange DLX encontrada")
+        except ChannelNotFoundEntity:
+            # O declare passivo que falha fecha o canal no broker
+            if self.channel.is_closed:
+                self.channel = await self.connection.channel()
             try:
-                await self.channel.declare_exchange(
+                self.dlx = await self.channel.declare_exchange(
                     'dlx',
                     ExchangeType.DIRECT,
                     durable=True
@@ -54,31 +60,40 @@ class QueueManager:
                 logger.error(f"Erro ao criar exchange DLX: {str(e)}")
                 raise
         except Exception as e:
-            logger.error(f"Erro ao criar exchange DLX: {str(e)}")
+            logger.error(f"Erro ao obter exchange DLX: {str(e)}")
             raise
 
+    def _queue_arguments(self, queue_name: str) -> dict:
+        """Argumentos das filas de processamento (TTL, DLX e prioridade)"""
+        return {
+            'x-message-ttl': 3600000,  # 1 hora
+            'x-dead-letter-exchange': 'dlx',
+            'x-dead-letter-routing-key': f"{queue_name}_failed",
+            'x-max-priority': 10
+        }
+
+    async def _get_queue(self, queue_name: str, arguments: dict = None):
+        """Retorna a fila declarada, declarando-a no broker apenas na primeira vez"""
+        queue = self._queues.get(queue_name)
+        if queue is None:
+            queue = await self.channel.declare_queue(
+                queue_name,
+                durable=True,
+                arguments=arguments
+            )
+            self._queues[queue_name] = queue
+        return queue
+
     async def process_queue(self, queue_name: str, callback):
         """Processa mensagens de uma fila específica"""
-        queue = await self.channel.declare_queue(
-            queue_name,
-            durable=True,
-            arguments={
-                'x-message-ttl': 3600000,  # 1 hora
-                'x-dead-letter-exchange': 'dlx',
-                'x-dead-letter-routing-key': f"{queue_name}_failed",
-                'x-max-priority': 10
-            }
-        )
+        queue = await self._get_queue(queue_name, self._queue_arguments(queue_name))
 
         # Declarando fila DLQ correspondente
-        dlq = await self.channel.declare_queue(
-            f"{queue_name}_failed",
-            durable=True
-        )
+        dlq = await self._get_queue(f"{queue_name}_failed")
 
         async def process_message(message: IncomingMessage):
             try:
-                data = json.loads(message.body.decode())
+                data = orjson.loads(message.body)
                 
                 # Verifica se a mensagem tem o formato correto
                 if 'filename' not in data:
@@ -96,7 +111,7 @@ class QueueManager:
                 logger.info(f"Processando arquivo da fila {queue_name}: {data['filename']}")
                 await callback(file_path, data)
                 await message.ack()
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.error(f"Erro ao decodificar mensagem JSON da fila {queue_name}")
                 await message.ack()  # Acknowledge para remover mensagens mal formatadas
             except Exception as e:
@@ -112,7 +127,7 @@ class QueueManager:
             queue_name = f"{queue_type}_processing"
             
             # Converte a mensagem para JSON
-            message_body = json.dumps(message).encode()
+            message_body = orjson.dumps(message)
             
             # Publica a mensagem
             await self.channel.default_exchange.publish(
@@ -126,9 +141,6 @@ class QueueManager:
             
             logger.info(f"Tarefa enfileirada na fila {queue_type}: {message}")
             
-            # Verifica status da fila após enfileirar
-            await self.check_queue_status(queue_name)
-            
         except Exception as e:
             logger.error(f"Erro ao enfileirar tarefa: {e}")
             raise
@@ -136,76 +148,63 @@ class QueueManager:
     async def purge_queues(self):
         """Limpa todas as filas"""
         for q in ["audio_processing", "document_processing", "image_processing", "video_processing"]:
-            queue = await self.channel.declare_queue(
-                q, 
-                durable=True,
-                arguments={
-                    'x-message-ttl': 3600000,
-                    'x-dead-letter-exchange': 'dlx',
-                    'x-dead-letter-routing-key': f"{q}_failed",
-                    'x-max-priority': 10
-                }
-            )
+            queue = await self._get_queue(q, self._queue_arguments(q))
             await queue.purge()
             logger.info(f"Fila {q} limpa")
 
             # Também limpa a fila DLQ correspondente
-            dlq = await self.channel.declare_queue(
-                f"{q}_failed",
-                durable=True
-            )
+            dlq = await self._get_queue(f"{q}_failed")
             await dlq.purge()
             logger.info(f"Fila {q}_failed limpa")
 
     async def purge_queue(self, queue_name: str):
         """Limpa uma fila específica"""
         if self.channel:
-            queue = await self.channel.declare_queue(
-                queue_name,
-                durable=True,
-                arguments={
-                    'x-message-ttl': 3600000,
-                    'x-dead-letter-exchange': 'dlx',
-                    'x-dead-letter-routing-key': f"{queue_name}_failed",
-                    'x-max-priority': 10
-                }
-            )
+            queue = await self._get_queue(queue_name, self._queue_arguments(queue_name))
             await queue.purge()
             logger.info(f"Fila {queue_name} foi limpa")
 
             # Também limpa a fila DLQ correspondente
-            dlq = await self.channel.declare_queue(
-                f"{queue_name}_failed",
-                durable=True
-            )
+            dlq = await self._get_queue(f"{queue_name}_failed")
             await dlq.purge()
             logger.info(f"Fila {queue_name}_failed foi limpa")
 
     async def close(self):
         """Fecha as conexões"""
+        for channel, _ in self._consumers.values():
+            await channel.close()
+        self._consumers.clear()
         if self.channel:
             await self.channel.close()
+        self._queues.clear()
         if self.connection:
             await self.connection.close()
 
-    async def setup_consumer(self, queue_name: str, callback):
-        """Configura um consumidor para a fila especificada"""
+    async def setup_consumer(self, queue_name: str, callback, prefetch: int = 16):
+        """
+        Configura um consumidor para a fila especificada.
+        'prefetch' define quantas mensagens não confirmadas o consumidor recebe
+        ao mesmo tempo; handlers que passam a maior parte do tempo aguardando
+        I/O se beneficiam de valores maiores, os CPU-bound de valores baixos.
+        """
         try:
-            queue = await self.channel.declare_queue(
-                queue_name,
-                durable=True,
-                arguments={
-                    'x-message-ttl': 3600000,
-                    'x-dead-letter-exchange': 'dlx',
-                    'x-dead-letter-routing-key': f'{queue_name}_failed',
-                    'x-max-priority': 10
-                }
-            )
-            
             logger.info(f"Iniciando consumo da fila {queue_name}")
             
-            # Adiciona prefetch_count para controlar quantas mensagens são processadas simultaneamente
-            await self.channel.set_qos(prefetch_count=1)
+            # Canal próprio com o QoS definido uma única vez: o canal robusto
+            # reaplica esse prefetch ao reconectar, o que não acontece se vários
+            # consumidores alternam set_qos em um canal compartilhado
+            if queue_name in self._consumers:
+                channel, queue = self._consumers[queue_name]
+            else:
+                channel = await self.connection.channel()
+                await channel.set_qos(prefetch_count=prefetch)
+                # Declarada no próprio canal para que o consumidor seja restaurado junto com ele
+                queue = await channel.declare_queue(
+                    queue_name,
+                    durable=True,
+                    arguments=self._queue_arguments(queue_name)
+                )
+                self._consumers[queue_name] = (channel, queue)
             
             # Configura o consumidor com o callback
             await queue.consume(callback)
@@ -219,7 +218,7 @@ class QueueManager:
         """Processa uma mensagem da fila"""
         try:
             async with message.process():
-                body = json.loads(message.body.decode())
+                body = orjson.loads(message.body)
                 logger.info(f"Processando mensagem: {body}")
                 # Seu código de processamento aqui
                 
@@ -232,7 +231,7 @@ class QueueManager:
         """Processa mensagem da fila de áudio"""
         try:
             async with message.process():
-                body = json.loads(message.body.decode())
+                body = orjson.loads(message.body)
                 logger.info(f"[AUDIO] Iniciando processamento: {body['file_name']}")
                 
                 if not self.mcp_server:
@@ -252,7 +251,7 @@ class QueueManager:
         """Processa mensagem da fila de documento"""
         try:
             async with message.process():
-                body = json.loads(message.body.decode())
+                body = orjson.loads(message.body)
                 logger.info(f"Processando mensagem de documento: {body}")
                 
                 if not self.mcp_server:
@@ -271,7 +270,7 @@ class QueueManager:
         """Processa mensagem da fila de imagem"""
         try:
             async with message.process():
-                body = json.loads(message.body.decode())
+                body = orjson.loads(message.body)
                 logger.info(f"Processando mensagem de imagem: {body}")
                 
                 if not self.mcp_server:
@@ -290,7 +289,7 @@ class QueueManager:
         """Processa mensagem da fila de vídeo"""
         try:
             async with message.process():
-                body = json.loads(message.body.decode())
+                body = orjson.loads(message.body)
                 logger.info(f"Processando mensagem de vídeo: {body}")
                 
                 if not self.mcp_server:
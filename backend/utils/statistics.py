@@ -2,11 +2,24 @@ import logging
 from dataclasses import dataclass, field
 from typing import List, Dict
 from pathlib import Path
-import json
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+LOG_DIR = Path("logs")
+_log_dir_ready = False
+# Um único worker: as gravações de log saem do caminho da requisição e ficam em ordem
+_log_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stats-log")
+
+def _write_log(log_file: Path, data: bytes):
+    try:
+        log_file.write_bytes(data)
+        logger.info(f"Log de processamento salvo em: {log_file}")
+    except Exception as e:
+        logger.error(f"Erro salvando log de processamento {log_file}: {e}")
+
 @dataclass
 class ProcessingStats:
     total_files: int = 0
@@ -26,27 +39,35 @@ class ProcessingStats:
         self.errors.append(error_entry)
         self.failed_files += 1
     
+    @property
+    def success_rate(self) -> float:
+        """Fração de arquivos processados (0.0 a 1.0)."""
+        if self.total_files == 0:
+            return 0.0
+        return self.processed_files / self.total_files
+    
     def to_dict(self):
         return {
             "total_files": self.total_files,
             "processed_files": self.processed_files,
             "failed_files": self.failed_files,
             "saved_to_db": self.saved_to_db,
-            "success_rate": f"{(self.processed_files/self.total_files)*100:.2f}%" if self.total_files > 0 else "0%",
+            "success_rate": self.success_rate,
             "errors": self.errors
         }
     
     def save_log(self, zip_name: str):
-        """Salva log de processamento."""
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
+        """Salva log de processamento em segundo plano."""
+        global _log_dir_ready
+        if not _log_dir_ready:
+            LOG_DIR.mkdir(exist_ok=True)
+            _log_dir_ready = True
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file = log_dir / f"processing_{timestamp}_{zip_name}.json"
+        log_file = LOG_DIR / f"processing_{timestamp}_{zip_name}.json"
         
         stats = self.to_dict()
-        logger.info(f"Estatísticas finais: {stats['processed_files']}/{stats['total_files']} processados ({stats['success_rate']})")
+        logger.info(f"Estatísticas finais: {stats['processed_files']}/{stats['total_files']} processados ({stats['success_rate']:.2%})")
         
-        with open(log_file, "w") as f:
-            json.dump(stats, f, indent=2)
-        logger.info(f"Log de processamento salvo em: {log_file}") 
\ No newline at end of file
+        # Serializa agora, para que alterações posteriores nas estatísticas não afetem o log
+        _log_writer.submit(_write_log, log_file, orjson.dumps(stats, option=orjson.OPT_INDENT_2))
\ No newline at end of file
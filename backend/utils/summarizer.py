@@ -1,8 +1,34 @@
+import os
+import struct
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+import torch
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+from .device import get_device, get_torch_dtype
+
+try:
+    import ctranslate2
+except ImportError:
+    # Sem ctranslate2 a sumarização roda no PyTorch (quantizado em int8 na CPU)
+    ctranslate2 = None
 
 logger = logging.getLogger(__name__)
 
+# Diretório do modelo convertido com:
+#   ct2-transformers-converter --model facebook/bart-large-cnn --quantization int8 --output_dir bart-ct2
+SUMMARIZER_CT2_DIR = os.getenv("SUMMARIZER_CT2_DIR")
+
+SUMMARY_CACHE_SIZE = 1024
+
+MAX_INPUT_TOKENS = 512
+# Abaixo disso o texto já é curto o bastante para ser o próprio sumário
+MIN_SUMMARY_TOKENS = 64
+# Em entradas curtas a qualidade satura com 2 feixes
+SHORT_INPUT_TOKENS = 256
+SHORT_INPUT_BEAMS = 2
+
 class Summarizer:
     """
     Classe responsável pela sumarização de texto usando um modelo pré-treinado, por padrão o 'facebook/bart-large-cnn'.
@@ -12,24 +38,47 @@ class Summarizer:
     - Método `summarize` que recebe texto bruto e retorna um sumário.
     - Opções para ajustar o comprimento máximo e mínimo do sumário.
     - Checagem caso o texto seja muito curto, evitando sumarização desnecessária.
+    - Inferência em int8: CTranslate2 quando há um modelo convertido, senão
+      quantização dinâmica das camadas lineares do PyTorch.
+    - Cache LRU dos sumários, chaveado pelo hash do texto e dos parâmetros de geração.
     """
 
-    def __init__(self, model_name: str = "facebook/bart-large-cnn"):
+    def __init__(self, model_name: str = "facebook/bart-large-cnn", ct2_model_dir: str = SUMMARIZER_CT2_DIR):
         """
         Construtor do Summarizer.
 
         :param model_name: Nome do modelo a ser carregado do HuggingFace Hub. Padrão: "facebook/bart-large-cnn".
+        :param ct2_model_dir: Diretório do modelo convertido para CTranslate2. Padrão: variável SUMMARIZER_CT2_DIR.
         """
         logger.info("Carregando modelo de sumarização local...")
 
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            logger.info(f"Modelo de sumarização '{model_name}' carregado com sucesso.")
+            self.device = get_device()
+            self.model = None
+            self.translator = None
+            if ctranslate2 is not None and ct2_model_dir and os.path.isdir(ct2_model_dir):
+                self.translator = ctranslate2.Translator(ct2_model_dir, device="auto", compute_type="int8")
+                logger.info(f"Modelo de sumarização CTranslate2 int8 carregado de '{ct2_model_dir}'.")
+            else:
+                model = AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=get_torch_dtype())
+                model.eval()
+                if self.device == "cuda":
+                    self.model = model.to(self.device)
+                else:
+                    # Quantização dinâmica int8: pesos das camadas lineares em 8 bits
+                    self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                logger.info(f"Modelo de sumarização '{model_name}' carregado com sucesso.")
         except Exception as e:
             logger.error(f"Erro ao carregar o modelo de sumarização '{model_name}': {e}")
             raise
 
+        # summarize roda em threads (asyncio.to_thread), por isso o lock
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+
     def summarize(
         self,
         text: str,
@@ -62,36 +111,83 @@ class Summarizer:
             logger.debug("Texto curto (menos de 200 caracteres), sumarização não é necessária. Retornando texto original.")
             return text
 
+        key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() + struct.pack(
+            '<iifi?', max_length, min_length, length_penalty, num_beams, early_stopping
+        )
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+                logger.debug(
+                    f"Sumário obtido do cache (acertos: {self._cache_hits}, falhas: {self._cache_misses})"
+                )
+                return cached
+            self._cache_misses += 1
+
+        # Tokenização única (tokenizer rápido, sem tensores), com truncamento se
+        # ultrapassar MAX_INPUT_TOKENS; os ids são reaproveitados na geração
+        try:
+            input_ids = self.tokenizer(text, truncation=True, max_length=MAX_INPUT_TOKENS)["input_ids"]
+        except Exception as e:
+            logger.error(f"Erro ao tokenizar o texto para sumarização: {e}")
+            return text  # Retorna o texto original em caso de falha
+
+        if len(input_ids) < MIN_SUMMARY_TOKENS:
+            logger.debug(f"Texto curto ({len(input_ids)} tokens), sumarização não é necessária. Retornando texto original.")
+            return text
+
+        if len(input_ids) < SHORT_INPUT_TOKENS:
+            num_beams = min(num_beams, SHORT_INPUT_BEAMS)
+
         # Logando algumas informações
         logger.debug(
-            f"Sumarizando texto com {len(text)} caracteres. "
+            f"Sumarizando texto com {len(text)} caracteres ({len(input_ids)} tokens). "
             f"Parâmetros: max_length={max_length}, min_length={min_length}, "
             f"length_penalty={length_penalty}, num_beams={num_beams}, early_stopping={early_stopping}"
         )
 
-        # Tokenização com truncamento se ultrapassar 512 tokens
-        # Isso evita erros ao tentar sumariar textos muito longos
-        try:
-            inputs = self.tokenizer(
-                text,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512
-            )
-        except Exception as e:
-            logger.error(f"Erro ao tokenizar o texto para sumarização: {e}")
-            return text  # Retorna o texto original em caso de falha
+        if self.translator is not None:
+            summary = self._summarize_ct2(text, input_ids, max_length, min_length, length_penalty, num_beams)
+        else:
+            summary = self._summarize_hf(text, input_ids, max_length, min_length, length_penalty, num_beams, early_stopping)
+
+        # Em caso de falha o texto original é devolvido; isso não vai para o cache
+        if summary is not text:
+            with self._cache_lock:
+                self._cache[key] = summary
+                if len(self._cache) > SUMMARY_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+
+        return summary
 
+    def _summarize_hf(
+        self,
+        text: str,
+        input_ids: list,
+        max_length: int,
+        min_length: int,
+        length_penalty: float,
+        num_beams: int,
+        early_stopping: bool
+    ) -> str:
+        """Gera o sumário com o modelo PyTorch do HuggingFace"""
         # Geração do sumário
+        # use_cache reaproveita as chaves/valores de atenção dos passos anteriores
+        # do decoder; inference_mode dispensa o registro de gradientes
         try:
-            summary_ids = self.model.generate(
-                inputs["input_ids"],
-                max_length=max_length,
-                min_length=min_length,
-                length_penalty=length_penalty,
-                num_beams=num_beams,
-                early_stopping=early_stopping
-            )
+            with torch.inference_mode():
+                inputs = torch.as_tensor([input_ids], device=self.device)
+                summary_ids = self.model.generate(
+                    inputs,
+                    attention_mask=torch.ones_like(inputs),
+                    max_length=max_length,
+                    min_length=min_length,
+                    length_penalty=length_penalty,
+                    num_beams=num_beams,
+                    early_stopping=early_stopping,
+                    use_cache=True
+                )
         except Exception as e:
             logger.error(f"Erro ao gerar sumário com o modelo: {e}")
             return text  # Em caso de falha na geração, retorna o texto original
@@ -101,6 +197,39 @@ class Summarizer:
         logger.debug(f"Sumarização concluída. Tamanho do sumário: {len(summary)} caracteres.")
 
         # Verifica se o sumário está vazio ou muito curto (pode acontecer se o modelo não conseguir sumarizar adequadamente)
+        if len(summary.strip()) == 0:
+            logger.warning("Sumário gerado está vazio. Retornando texto original.")
+            return text
+
+        return summary
+
+    def _summarize_ct2(
+        self,
+        text: str,
+        input_ids: list,
+        max_length: int,
+        min_length: int,
+        length_penalty: float,
+        num_beams: int
+    ) -> str:
+        """Gera o sumário com o modelo CTranslate2; o tokenizer continua sendo o do HuggingFace"""
+        try:
+            tokens = self.tokenizer.convert_ids_to_tokens(input_ids)
+            results = self.translator.translate_batch(
+                [tokens],
+                beam_size=num_beams,
+                max_decoding_length=max_length,
+                min_decoding_length=min_length,
+                length_penalty=length_penalty
+            )
+        except Exception as e:
+            logger.error(f"Erro ao gerar sumário com o modelo: {e}")
+            return text
+
+        output_ids = self.tokenizer.convert_tokens_to_ids(results[0].hypotheses[0])
+        summary = self.tokenizer.decode(output_ids, skip_special_tokens=True)
+        logger.debug(f"Sumarização concluída. Tamanho do sumário: {len(summary)} caracteres.")
+
         if len(summary.strip()) == 0:
             logger.warning("Sumário gerado está vazio. Retornando texto original.")
             return text
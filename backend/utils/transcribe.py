@@ -1,22 +1,162 @@
-import whisper
+import os
+import asyncio
+import functools
 import logging
+import numpy as np
 from pathlib import Path
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+from faster_whisper.audio import decode_audio, pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+from .device import get_device
 
 logger = logging.getLogger(__name__)
 
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+
+# Chamadas a process() que chegam dentro da janela são transcritas juntas
+BATCH_WINDOW = 0.1  # segundos
+# Máximo de arquivos por lote, e de janelas de 30s por lote no pipeline dos áudios longos
+BATCH_SIZE = 16
+# Limite de tokens gerados por janela de 30s (o mesmo do Whisper)
+MAX_NEW_TOKENS = 448
+
+@functools.lru_cache(maxsize=1)
+def get_whisper_model(name: str = WHISPER_MODEL):
+    """Carrega o modelo Whisper (CTranslate2, int8) uma única vez por processo e o reutiliza"""
+    device = get_device()
+    compute_type = "int8_float16" if device == "cuda" else "int8"
+    logger.info(f"Carregando modelo Whisper (versão: {name}, {device}/{compute_type})...")
+    model = WhisperModel(name, device=device, compute_type=compute_type)
+    logger.info("Modelo Whisper carregado")
+    return model
+
 class AudioProcessor:
     def __init__(self):
-        self.model = whisper.load_model("base")
-        logger.info("Modelo Whisper carregado")
+        self.model = get_whisper_model()
+        self.pipeline = BatchedInferencePipeline(model=self.model)
+        self._queue = None
+        self._worker = None
         
     async def process(self, file_path: str) -> str:
         try:
-            result = self.model.transcribe(file_path)
-            return result["text"]
+            if self._worker is None:
+                self._queue = asyncio.Queue()
+                self._worker = asyncio.create_task(self._batch_loop())
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((file_path, future))
+            return await future
         except Exception as e:
             logger.error(f"Erro transcrevendo áudio: {e}")
             raise
 
     async def transcribe_audio(self, file_path: str) -> str:
         """Alias para process"""
-        return await self.process(file_path)
\ No newline at end of file
+        return await self.process(file_path)
+
+    async def _batch_loop(self):
+        """
+        Agrupa as requisições que chegam dentro de BATCH_WINDOW (até BATCH_SIZE)
+        e transcreve o lote em uma thread, fora do event loop.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + BATCH_WINDOW
+            while len(batch) < BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await asyncio.to_thread(self._transcribe_batch, [path for path, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _transcribe_batch(self, paths: list) -> list:
+        """
+        Transcreve um lote de arquivos. Áudios de até 30s (uma janela do Whisper)
+        são decodificados juntos em um único batch; áudios maiores seguem pelo
+        pipeline em lote, que corta o silêncio com VAD e janela o áudio.
+        Retorna, na ordem de 'paths', o texto ou a exceção de cada arquivo.
+        """
+        feature_extractor = self.model.feature_extractor
+        results = [None] * len(paths)
+        short_clips = []
+        for i, path in enumerate(paths):
+            try:
+                audio = decode_audio(path, sampling_rate=feature_extractor.sampling_rate)
+                if len(audio) <= feature_extractor.n_samples:
+                    short_clips.append((i, audio))
+                else:
+                    results[i] = self._transcribe_long(audio)
+            except Exception as e:
+                results[i] = e
+
+        if short_clips:
+            try:
+                texts = self._transcribe_short([audio for _, audio in short_clips])
+                for (i, _), text in zip(short_clips, texts):
+                    results[i] = text
+            except Exception as e:
+                for i, _ in short_clips:
+                    results[i] = e
+
+        return results
+
+    def _transcribe_long(self, audio: np.ndarray) -> str:
+        segments, _ = self.pipeline.transcribe(
+            audio,
+            batch_size=BATCH_SIZE,
+            beam_size=1,
+            vad_filter=True
+        )
+        # segments é um gerador: a decodificação acontece durante a iteração
+        return "".join(segment.text for segment in segments)
+
+    def _transcribe_short(self, audios: list) -> list:
+        """
+        Uma única passada do encoder e do decoder para todos os clipes: as
+        features são empilhadas e o idioma é detectado por clipe.
+        """
+        features = np.stack([
+            pad_or_trim(self.model.feature_extractor(audio)) for audio in audios
+        ])
+        encoder_output = self.model.encode(features)
+
+        ct2_model = self.model.model
+        multilingual = ct2_model.is_multilingual
+        # O token de idioma do prompt é trocado pelo detectado em cada clipe
+        tokenizer = Tokenizer(
+            self.model.hf_tokenizer,
+            multilingual,
+            task="transcribe",
+            language="pt" if multilingual else None
+        )
+        prompt = tokenizer.sot_sequence + [tokenizer.no_timestamps]
+        prompts = [list(prompt) for _ in audios]
+        if multilingual:
+            language_index = prompt.index(tokenizer.language)
+            for p, langs in zip(prompts, ct2_model.detect_language(encoder_output)):
+                p[language_index] = tokenizer.tokenizer.token_to_id(langs[0][0])
+
+        results = ct2_model.generate(
+            encoder_output,
+            prompts,
+            beam_size=1,
+            max_length=MAX_NEW_TOKENS,
+            suppress_blank=True,
+            suppress_tokens=[-1]
+        )
+        return [tokenizer.decode(result.sequences_ids[0]).strip() for result in results]
\ No newline at end of file
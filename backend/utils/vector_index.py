@@ -1,14 +1,13 @@
-import faiss
-import numpy as np
 import logging
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from .faiss_common import ENCODE_BATCH_SIZE, load_encoder, create_index
 
 logger = logging.getLogger(__name__)
 
 class VectorIndex:
     def __init__(self, model_name='all-MiniLM-L6-v2'):
         logger.info("Carregando modelo de embeddings...")
-        self.model = SentenceTransformer(model_name)
+        self.model = load_encoder(model_name)
         logger.info("Modelo de embeddings carregado.")
         self.index = None
         self.docs_map = []
@@ -21,14 +20,16 @@ class VectorIndex:
             self.docs_map = []
             return
 
-        texts = [d['content'] for d in docs if d['content'] and d['content'].strip()]
+        # Uma única passada: textos e documentos ficam alinhados por posição
+        valid_docs = [d for d in docs if d.get('content') and d['content'].strip()]
+        texts = [d['content'] for d in valid_docs]
         if len(texts) == 0:
             logger.warning("Nenhum texto válido para criar embeddings. Índice não será criado.")
             self.index = None
             self.docs_map = []
             return
 
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        embeddings = self._encode(texts)
         # Verifica se embeddings é vazio ou tem dimensões inesperadas
         if embeddings.size == 0 or embeddings.ndim < 2:
             logger.warning("Embeddings vazios ou inválidos. Índice não será criado.")
@@ -44,31 +45,40 @@ class VectorIndex:
             return
 
         # Criação do índice FAISS
-        self.index = faiss.IndexFlatL2(embeddings.shape[1])
-        self.index.add(embeddings.astype('float32'))
+        self.index = create_index(embeddings.shape[1], embeddings.shape[0])
+        self.index.add(embeddings)
 
         # Mapeamos apenas os docs que realmente tiveram conteúdo
-        valid_docs = []
-        count = 0
-        for d in docs:
-            if d['content'] and d['content'].strip():
-                valid_docs.append(d)
         self.docs_map = valid_docs
 
         logger.info("Índice FAISS construído com sucesso")
 
+    def _encode(self, texts):
+        """Gera os embeddings (float32, como o FAISS espera) em lotes de ENCODE_BATCH_SIZE"""
+        return self.model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+
     def search(self, query, top_k=5):
+        return self.search_many([query], top_k)[0]
+
+    def search_many(self, queries, top_k=5):
+        """Busca várias consultas de uma vez: um único encode e uma única busca no índice"""
         # Se o índice não existe ou sem docs, retorna vazio
         if self.index is None or len(self.docs_map) == 0:
             logger.warning("Índice vazio ou sem documentos. Retornando lista vazia.")
-            return []
-        q_embed = self.model.encode([query], convert_to_numpy=True).astype('float32')
+            return [[] for _ in queries]
+        q_embed = self._encode(queries)
         D, I = self.index.search(q_embed, top_k)
-        results = []
-        for idx in I[0]:
-            if 0 <= idx < len(self.docs_map):
-                results.append(self.docs_map[idx])
+        # tolist() converte a matriz de uma vez, sem criar um escalar numpy por elemento;
+        # o FAISS devolve -1 quando há menos de 'top_k' resultados
+        n_docs = len(self.docs_map)
+        results = [[self.docs_map[idx] for idx in row if 0 <= idx < n_docs] for row in I.tolist()]
         return results
 
     def embed_text(self, text):
-        return self.model.encode([text], convert_to_numpy=True)[0]
\ No newline at end of file
+        return self._encode([text])[0]
\ No newline at end of file
@@ -1,11 +1,18 @@
 import logging
 import os
+from pathlib import Path
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+from .faiss_common import ENCODE_BATCH_SIZE, load_encoder, create_index
+from .embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
+# Fica junto do banco (backend/database), fora do código; JUS_EMBEDDING_CACHE_DIR permite outro local
+EMBEDDING_CACHE_DIR = Path(os.environ.get(
+    "JUS_EMBEDDING_CACHE_DIR", Path(__file__).parents[1] / "database" / "embedding_cache"
+))
+
 class VectorSearcher:
     """
     Classe para busca vetorial usando embeddings e FAISS.
@@ -17,7 +24,8 @@ class VectorSearcher:
     - Fazer buscas semânticas: dado um query, gerar embedding e recuperar os k mais similares.
 
     Observação:
-    - Aqui mantemos tudo em memória. Para persistência, precisaria salvar o índice FAISS em disco.
+    - O índice FAISS fica em memória; os embeddings dos documentos ficam em cache
+      em disco (EmbeddingCache), então reconstruir o índice não recodifica textos já vistos.
     - Cada documento será armazenado em self.docs_map como um dict ou texto.
     - IDs dos documentos serão simplesmente o índice no self.docs_map.
     - Em um sistema real, você pode armazenar IDs ou metadados mais ricos.
@@ -25,9 +33,14 @@ class VectorSearcher:
 
     def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
         logger.info("Carregando modelo de embeddings...")
-        self.model = SentenceTransformer(model_name)
+        self.model = load_encoder(model_name)
         logger.info(f"Modelo de embeddings '{model_name}' carregado com sucesso.")
 
+        self.embedding_cache = EmbeddingCache(
+            EMBEDDING_CACHE_DIR / model_name.replace("/", "__"),
+            self.model.get_sentence_embedding_dimension()
+        )
+
         self.index = None
         self.docs_map = []
         self.dimension = None  # será definido após gerar o primeiro embedding
@@ -44,15 +57,15 @@ class VectorSearcher:
             return
 
         logger.info(f"Gerando embeddings para {len(texts)} documentos...")
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        embeddings = self._encode_documents(texts)
 
         # Definir a dimensão dos embeddings
         self.dimension = embeddings.shape[1]
 
         # Criar o índice FAISS
         logger.info("Construindo índice FAISS...")
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(embeddings.astype('float32'))
+        self.index = create_index(self.dimension, embeddings.shape[0])
+        self.index.add(embeddings)
 
         # Mapeamento id->doc
         self.docs_map = texts
@@ -67,44 +80,80 @@ class VectorSearcher:
             logger.debug("Nenhum documento fornecido em add_documents.")
             return
 
-        embeddings = self.model.encode(new_texts, convert_to_numpy=True)
+        embeddings = self._encode_documents(new_texts)
 
         if self.index is None:
             # criar um novo índice
             logger.info("Índice inexistente, criando novo índice com os documentos fornecidos.")
             self.dimension = embeddings.shape[1]
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.index.add(embeddings.astype('float32'))
+            self.index = create_index(self.dimension, embeddings.shape[0])
+            self.index.add(embeddings)
             self.docs_map = new_texts
         else:
             # verificar se a dimensão bate
             if embeddings.shape[1] != self.dimension:
                 logger.error("A dimensão dos novos embeddings não bate com a dimensão do índice existente.")
                 return
-            self.index.add(embeddings.astype('float32'))
+            self.index.add(embeddings)
             self.docs_map.extend(new_texts)
 
         logger.info(f"{len(new_texts)} documentos adicionados ao índice vetorial.")
 
+    def _encode(self, texts: list):
+        """Gera os embeddings (float32, como o FAISS espera) em lotes de ENCODE_BATCH_SIZE."""
+        return self.model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+
+    def _encode_documents(self, texts: list) -> np.ndarray:
+        """
+        Embeddings dos documentos passando pelo cache: só os textos ainda não
+        vistos vão para o modelo.
+        """
+        keys = [EmbeddingCache.key(t) for t in texts]
+        rows = self.embedding_cache.lookup(keys)
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in rows and k not in missing:
+                missing[k] = t
+        if missing:
+            logger.info(f"{len(texts) - len(missing)} embeddings em cache, gerando {len(missing)}...")
+            rows.update(self.embedding_cache.append(list(missing), self._encode(list(missing.values()))))
+
+        return self.embedding_cache.take([rows[k] for k in keys])
+
     def search(self, query: str, top: int = 5) -> list:
         """
         Faz uma busca semântica por query e retorna os textos dos documentos mais similares.
         Caso o índice esteja vazio ou não exista, retorna lista vazia.
         """
+        return self.search_many([query], top)[0]
+
+    def search_many(self, queries: list, top: int = 5) -> list:
+        """
+        Busca várias queries de uma vez: os embeddings são gerados num único encode
+        e o FAISS resolve todas as buscas numa única chamada.
+        Retorna uma lista de resultados por query, na mesma ordem.
+        """
         if self.index is None or len(self.docs_map) == 0:
             logger.warning("Índice vazio ou não inicializado. Retornando lista vazia.")
-            return []
+            return [[] for _ in queries]
 
-        # Gerar embedding da query
-        q_embed = self.model.encode([query], convert_to_numpy=True).astype('float32')
+        # Gerar embeddings das queries
+        q_embed = self._encode(queries)
         D, I = self.index.search(q_embed, top)
 
-        # I é uma matriz [1, top] com índices dos docs mais similares
+        # I é uma matriz [len(queries), top] com índices dos docs mais similares
         # Se quiser também distâncias, D as contém.
-        results = []
-        for idx in I[0]:
-            if 0 <= idx < len(self.docs_map):
-                results.append(self.docs_map[idx])
+        # tolist() converte a matriz de uma vez, sem criar um escalar numpy por elemento;
+        # o FAISS devolve -1 quando há menos de 'top' resultados
+        n_docs = len(self.docs_map)
+        results = [[self.docs_map[idx] for idx in row if 0 <= idx < n_docs] for row in I.tolist()]
 
         return results
 
@@ -123,7 +172,11 @@ class VectorSearcher:
         Também seria preciso salvar self.docs_map separadamente (ex: em JSON).
         """
         if self.index is not None:
-            faiss.write_index(self.index, path)
+            index = self.index
+            if hasattr(index, "getDevice"):
+                # Índices em GPU precisam voltar para a CPU antes de serializar
+                index = faiss.index_gpu_to_cpu(index)
+            faiss.write_index(index, path)
             logger.info(f"Índice FAISS salvo em {path}.")
         else:
             logger.warning("Nenhum índice para salvar.")
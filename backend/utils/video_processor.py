@@ -1,13 +1,27 @@
+import os
+import json
+import asyncio
+import shutil
 import logging
+import threading
+import subprocess
 import cv2
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+PROBE_CACHE_SIZE = 256
+FFPROBE = shutil.which("ffprobe")
+
 class VideoProcessor:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self._initialized = False
+        # (caminho, mtime) -> {"duration", "width", "height"}
+        self._probe_cache = {}
+        self._probe_cache_lock = threading.Lock()
+        # Limita quantos vídeos são sondados ao mesmo tempo (cada ffprobe é um processo)
+        self._probe_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
 
     async def initialize(self):
         """Inicializa o processador de vídeos"""
@@ -29,10 +43,9 @@ class VideoProcessor:
                 await self.initialize()
 
             # Por enquanto retorna apenas metadados como texto
-            duration = await self.get_duration(file_path)
-            resolution = await self.get_resolution(file_path)
+            info = await self._probe_async(file_path)
             
-            text = f"Vídeo processado. Duração: {duration}s, Resolução: {resolution['width']}x{resolution['height']}"
+            text = f"Vídeo processado. Duração: {info['duration']}s, Resolução: {info['width']}x{info['height']}"
             return text
             
         except Exception as e:
@@ -42,17 +55,7 @@ class VideoProcessor:
     async def get_duration(self, file_path: str) -> float:
         """Retorna a duração do vídeo em segundos"""
         try:
-            cap = cv2.VideoCapture(file_path)
-            if not cap.isOpened():
-                return 0.0
-            
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = frame_count/fps
-            
-            cap.release()
-            return round(duration, 2)
-            
+            return (await self._probe_async(file_path))["duration"]
         except Exception as e:
             self.logger.error(f"Erro obtendo duração do vídeo {file_path}: {e}")
             return 0.0
@@ -60,16 +63,71 @@ class VideoProcessor:
     async def get_resolution(self, file_path: str) -> dict:
         """Retorna as dimensões do vídeo"""
         try:
-            cap = cv2.VideoCapture(file_path)
-            if not cap.isOpened():
-                return {"width": 0, "height": 0}
-            
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            cap.release()
-            return {"width": width, "height": height}
-            
+            info = await self._probe_async(file_path)
+            return {"width": info["width"], "height": info["height"]}
         except Exception as e:
             self.logger.error(f"Erro obtendo resolução do vídeo {file_path}: {e}")
-            return {"width": 0, "height": 0}
\ No newline at end of file
+            return {"width": 0, "height": 0}
+
+    async def _probe_async(self, file_path: str) -> dict:
+        """Executa a sondagem bloqueante (subprocess/OpenCV) fora do event loop"""
+        async with self._probe_semaphore:
+            return await asyncio.to_thread(self._probe, file_path)
+
+    def _probe(self, file_path: str) -> dict:
+        """
+        Lê duração e dimensões do vídeo de uma só vez e guarda em cache,
+        para que get_duration e get_resolution não abram o arquivo cada um.
+        """
+        key = (file_path, os.path.getmtime(file_path))
+        with self._probe_cache_lock:
+            info = self._probe_cache.get(key)
+        if info is not None:
+            return info
+
+        info = self._probe_ffprobe(file_path) if FFPROBE else self._probe_cv2(file_path)
+
+        with self._probe_cache_lock:
+            if len(self._probe_cache) >= PROBE_CACHE_SIZE:
+                self._probe_cache.pop(next(iter(self._probe_cache)))
+            self._probe_cache[key] = info
+        return info
+
+    def _probe_ffprobe(self, file_path: str) -> dict:
+        """Metadados via ffprobe: lê apenas os cabeçalhos, sem inicializar o decodificador"""
+        result = subprocess.run(
+            [
+                FFPROBE, "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=width,height,duration:format=duration",
+                "-of", "json", file_path
+            ],
+            capture_output=True,
+            check=True
+        )
+        data = json.loads(result.stdout)
+        streams = data.get("streams") or [{}]
+        stream = streams[0]
+        # Alguns contêineres (mkv, webm) só informam a duração no formato
+        duration = stream.get("duration") or data.get("format", {}).get("duration") or 0.0
+        return {
+            "duration": round(float(duration), 2),
+            "width": int(stream.get("width", 0)),
+            "height": int(stream.get("height", 0))
+        }
+
+    def _probe_cv2(self, file_path: str) -> dict:
+        """Metadados via OpenCV, usado quando o ffprobe não está instalado"""
+        cap = cv2.VideoCapture(file_path)
+        try:
+            if not cap.isOpened():
+                return {"duration": 0.0, "width": 0, "height": 0}
+
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            return {
+                "duration": round(frame_count / fps, 2) if fps else 0.0,
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            }
+        finally:
+            cap.release()
\ No newline at end of file